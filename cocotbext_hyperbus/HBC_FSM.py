@@ -9,33 +9,28 @@ class DQDriver:
     def __init__(self, dut):
         self.dut = dut
 
-    async def drive(self, value):
+    def drive(self, value):
         self.dut.DQ.value = value
-        await Timer(1, 'ns')  # Small delay to ensure the value is driven
 
-    async def drive_high_impedance(self):
+    def drive_high_impedance(self):
         self.dut.DQ.value = BinaryValue('Z')
-        await Timer(1, 'ns')  # Small delay to ensure the value is driven
 
 class RWDSDriver:
     def __init__(self, dut):
         self.dut = dut
 
-    async def drive(self, value):
+    def drive(self, value):
         self.dut.rwds.value = value
-        await Timer(1, 'ns')  # Small delay to ensure the value is driven
 
-    async def drive_high_impedance(self):
+    def drive_high_impedance(self):
         self.dut.rwds.value = BinaryValue('Z')
-        await Timer(1, 'ns')  # Small delay to ensure the value is driven
 
 class CS_Driver:
     def __init__(self, dut):
         self.dut = dut
 
-    async def drive(self, value):
+    def drive(self, value):
         self.dut.csneg.value = value
-        await Timer(1, 'ns')  # Small delay to ensure the value is driven
 
 class HyperBus_FSM:
     # FSM States
@@ -167,9 +162,9 @@ class HyperBus_FSM:
             self.io_dq = self.o_dq if self.o_dq_de else self.highimp_8
             self.io_rwds = self.o_rwds if self.o_rwds_de else BinaryValue(self.highimp_1)
 
-            await self.cs_driver.drive(self.o_csn0)
-            await self.dq_driver.drive(self.io_dq)
-            await self.rwds_driver.drive(self.io_rwds)
+            self.cs_driver.drive(self.o_csn0)
+            self.dq_driver.drive(self.io_dq)
+            self.rwds_driver.drive(self.io_rwds)
             await Timer(10, 'ns')
 
     def fsm_reset(self):
@@ -1,61 +1,205 @@
+import logging
+import struct
+from functools import lru_cache
+
 import cocotb
-from cocotb.triggers import Timer, RisingEdge, FallingEdge
+from cocotb.triggers import Timer, RisingEdge, FallingEdge, Edge
 from cocotb.clock import Clock
 from cocotb.utils import get_sim_time
 from cocotb.binary import BinaryValue
 from cocotb_bus.bus import Bus
 
+# High-impedance values are constant; build them once instead of per drive
+_HIZ = BinaryValue('Z')
+_HIZ_8 = BinaryValue('ZZZZZZZZ', 8)
+_BIT_VALUES = {bit: BinaryValue(bit) for bit in '01xXzZ'}
+
+# The 48-bit CA word is decoded as a big-endian 64-bit load of a buffer
+# whose first two bytes stay zero
+_CA_UNPACK = struct.Struct('>Q').unpack_from
+
+@lru_cache(maxsize=256)
+def _as_bv(value):
+    # Patterns such as 'zzzzzzzz' are driven repeatedly; share one BinaryValue each
+    return BinaryValue(value, 8)
+
 class MemoryRegion:
-    def __init__(self, size):
+    """
+    Sparse byte-addressable memory.
+
+    Storage is split into fixed-size pages that are only allocated when first
+    written, so a full 2**32 address space costs nothing until it is used.
+    Reads from untouched pages return zeros.
+    """
+    def __init__(self, size, page_size=4096):
+        if page_size <= 0 or page_size & (page_size - 1):
+            raise ValueError(f"page_size must be a power of two, got {page_size}")
         self.size = size
-        self.memory = bytearray(size)
+        self._page_size = page_size
+        self._page_shift = page_size.bit_length() - 1
+        self._page_mask = page_size - 1
+        self._pages = {}
+        self._zero_page = memoryview(bytes(page_size))
+        # Bursts are contiguous, so most accesses hit the same page as the last one
+        self._last_index = None
+        self._last_page = None
+
+    def _get_page(self, index, allocate=False):
+        if index == self._last_index:
+            return self._last_page
+        page = self._pages.get(index)
+        if page is None:
+            if not allocate:
+                return self._zero_page
+            page = self._pages[index] = memoryview(bytearray(self._page_size))
+        self._last_index = index
+        self._last_page = page
+        return page
 
     def read(self, address, length):
-        return bytes(self.memory[address:address+length])
-
-    def write(self, address, data, length):
-        self.memory[address:address+length] = data
+        return self.view(address, length).tobytes()
+
+    def view(self, address, length):
+        # Zero-copy access when the range lies within a single page
+        offset = address & self._page_mask
+        if offset + length <= self._page_size:
+            return self._get_page(address >> self._page_shift)[offset:offset+length]
+        data = bytearray(length)
+        pos = 0
+        while pos < length:
+            offset = (address + pos) & self._page_mask
+            chunk = min(length - pos, self._page_size - offset)
+            page = self._get_page((address + pos) >> self._page_shift)
+            data[pos:pos+chunk] = page[offset:offset+chunk]
+            pos += chunk
+        return memoryview(data)
+
+    def write(self, address, data, length=None):
+        # Integers are stored little-endian in `length` bytes. Any C-contiguous
+        # buffer (bytes, array.array, numpy.ndarray, ...) is copied straight
+        # into the pages; other data (iterables of ints, non-contiguous arrays)
+        # goes through bytes() first. `length` defaults to the full size.
+        if isinstance(data, int):
+            if length is None:
+                raise ValueError("length is required when writing an integer")
+            data = data.to_bytes(length, 'little')
+        try:
+            data = memoryview(data).cast('B')
+        except TypeError:
+            data = memoryview(bytes(data))
+        data = data[:length]
+        length = len(data)
+        pos = 0
+        while pos < length:
+            offset = (address + pos) & self._page_mask
+            chunk = min(length - pos, self._page_size - offset)
+            page = self._get_page((address + pos) >> self._page_shift, allocate=True)
+            page[offset:offset+chunk] = data[pos:pos+chunk]
+            pos += chunk
 
 class DQDriver:
-    def __init__(self, dut):
-        self.dut = dut
+    # dqN carries bit N of the byte, the same order as a packed
+    # `dq = {dq7, ..., dq0}` bus and the controller's drive_dq
+    _DQ_SHIFTS = (0, 1, 2, 3, 4, 5, 6, 7)
 
-    async def drive(self, value):
-        if isinstance(value, str):
-            value = BinaryValue(value, 8)
-        elif not isinstance(value, BinaryValue):
+    def __init__(self, dut, dq_bus=None):
+        self.dut = dut
+        # Optional packed, drivable 8-bit DQ handle (bit N = dqN). When given,
+        # a byte is written in a single assignment; a continuously assigned
+        # wire such as the wrapper's `dq` must not be used here.
+        self._dq_bus = dq_bus
+        # Otherwise the individual DQ pins are resolved once, on first use
+        self._dq_handles = None
+
+    def _pins(self):
+        # Looked up lazily so the driver can be built for a DUT without dq0..dq7
+        # (e.g. an hbc top level), failing only if it is actually driven
+        if self._dq_handles is None:
+            self._dq_handles = tuple(getattr(self.dut, f'dq{i}') for i in range(8))
+        return self._dq_handles
+
+    def drive(self, value):
+        # Exact type checks first; isinstance is only needed for subclasses
+        value_type = type(value)
+        if value_type is str:
+            value = _as_bv(value)
+        elif value_type is not int and value_type is not BinaryValue and not isinstance(value, BinaryValue):
             value = BinaryValue(value, 8)
-        
-        for i in range(8):
-            self.dut.__getattr__(f'dq{i}').value = value[i]
-        await Timer(1, 'ns')  # Small delay to ensure the value is driven
 
-    async def drive_high_impedance(self):
-        for i in range(8):
-            self.dut.__getattr__(f'dq{i}').value = BinaryValue('Z')
-        await Timer(1, 'ns')  # Small delay to ensure the value is driven
+        if self._dq_bus is not None:
+            self._dq_bus.value = value
+            return
+
+        if value_type is not int:
+            if not value.is_resolvable:
+                # X/Z bits cannot be expressed as an integer, drive them bit by bit
+                # from the bit string, reusing one BinaryValue per bit character.
+                # binstr is MSB first whatever the endianness, as for .integer
+                for handle, bit in zip(self._dq_handles or self._pins(), value.binstr[::-1]):
+                    bit_value = _BIT_VALUES.get(bit)
+                    handle.value = bit_value if bit_value is not None else BinaryValue(bit)
+                return
+            value = value.integer
+
+        for handle, shift in zip(self._dq_handles or self._pins(), self._DQ_SHIFTS):
+            handle.value = (value >> shift) & 1
+
+    async def drive_burst(self, data, clk):
+        # Drive one byte per rising edge of clk; iterating bytes yields plain
+        # ints, which take the integer fast path in drive(). DQ is released when
+        # the data runs out. The controller may end the burst early by raising
+        # CS#, after which clk stops: run this as a task and kill it on CS#
+        # rising, then call drive_high_impedance() (kill skips the release here).
+        edge = RisingEdge(clk)
+        drive = self.drive
+        for byte in data:
+            drive(byte)
+            await edge
+        self.drive_high_impedance()
+
+    def drive_high_impedance(self):
+        if self._dq_bus is not None:
+            self._dq_bus.value = _HIZ_8
+            return
+        for handle in self._dq_handles or self._pins():
+            handle.value = _HIZ
 
 class RWDSDriver:
     def __init__(self, dut):
         self.dut = dut
+        self._rwds = None  # Resolved on first drive; the DUT may not have `rwds`
 
-    async def drive(self, value):
-        self.dut.rwds.value = value
-        await Timer(1, 'ns')  # Small delay to ensure the value is driven
+    def drive(self, value):
+        if self._rwds is None:
+            self._rwds = self.dut.rwds
+        self._rwds.value = value
 
-    async def drive_high_impedance(self):
-        self.dut.rwds.value = BinaryValue('Z')
-        await Timer(1, 'ns')  # Small delay to ensure the value is driven
+    def drive_high_impedance(self):
+        if self._rwds is None:
+            self._rwds = self.dut.rwds
+        self._rwds.value = _HIZ
 
 class CS_Driver:
     def __init__(self, dut):
         self.dut = dut
+        self._csneg = None  # Resolved on first drive; the DUT may not have `csneg`
 
-    async def drive(self, value):
-        self.dut.csneg.value = value
-        await Timer(1, 'ns')  # Small delay to ensure the value is driven
+    def drive(self, value):
+        if self._csneg is None:
+            self._csneg = self.dut.csneg
+        self._csneg.value = value
 
 class ConfigurationRegister:
+    # CR0 layout as (attribute, shift, mask)
+    _FIELDS = (
+        ('deep_power_down', 15, 0x1),
+        ('output_drive_strength', 12, 0x7),
+        ('initial_latency', 4, 0xF),
+        ('fixed_latency', 3, 0x1),
+        ('burst_length', 1, 0x3),
+        ('hybrid_wrap', 0, 0x1),
+    )
+
     def __init__(self):
         self.deep_power_down = 0
         self.output_drive_strength = 0
@@ -65,17 +209,14 @@ class ConfigurationRegister:
         self.hybrid_wrap = False
 
     def set_register(self, register_value):
-        self.deep_power_down = (register_value >> 15) & 0x1
-        self.output_drive_strength = (register_value >> 12) & 0x7
-        self.initial_latency = (register_value >> 4) & 0xF
-        self.fixed_latency = (register_value >> 3) & 0x1
-        self.burst_length = (register_value >> 1) & 0x3
-        self.hybrid_wrap = register_value & 0x1
+        fields = self.__dict__
+        for name, shift, mask in self._FIELDS:
+            fields[name] = (register_value >> shift) & mask
 
 class HyperBusMemory(Bus):
     _signals = ['ck', 'o_csn0', 'o_dq', 'i_dq', 'o_rwds', 'i_rwds']
 
-    def __init__(self, dut, clk, rst, address_width=32, data_width=32, initial_latency=4, fixed_latency=True, burst_length=32):
+    def __init__(self, dut, clk, rst, address_width=32, data_width=32, initial_latency=4, fixed_latency=True, burst_length=32, generate_clock=False, clk_period=10, dq_bus=None):
         super().__init__(dut, "hyperbus", self._signals)
         self.dut = dut
         self.clk = clk
@@ -83,25 +224,40 @@ class HyperBusMemory(Bus):
         self.bus = dut
         self.address_width = address_width
         self.data_width = data_width
+        self._data_bytes = data_width // 8
         self.memory = MemoryRegion(2**address_width)  # Initialize memory region
         self.initial_latency = initial_latency
         self.fixed_latency = fixed_latency
+        self.clk_period = clk_period  # Clock period in ns, used to time the initial latency
         self.burst_length = burst_length
-        self.ca_bytes = []
+        # Preallocated CA buffer, filled by index as the 6 CA bytes arrive;
+        # bytes 0-1 are zero padding so the word unpacks as a single '>Q'
+        self._ca_buf = bytearray(8)
+        self._ca_idx = 0
         self.config_register = ConfigurationRegister()
+        self._logger = logging.getLogger(__name__)
+
+        # Cache the signal handles initialized below; `ck` and `rwds` are only
+        # looked up in handle_transactions, as not every top level has them
+        self._csn = self.bus.o_csn0
+        self._i_dq = self.bus.i_dq
+        self._i_rwds = self.bus.i_rwds
 
         # Initialize signals
-        self.bus.o_csn0.value = 1
-        self.bus.i_rwds.value = 1
-        self.bus.i_dq.value = 0
+        self._csn.value = 1
+        self._i_rwds.value = 1
+        self._i_dq.value = 0
 
         # Initialize drivers
-        self.dq_driver = DQDriver(dut)
+        # dq_bus: optional packed, drivable 8-bit DQ handle passed on to DQDriver
+        self.dq_driver = DQDriver(dut, dq_bus=dq_bus)
         self.rwds_driver = RWDSDriver(dut)
         self.cs_driver = CS_Driver(dut)
 
-        # Start the clock
-        cocotb.start_soon(Clock(self.clk, 10, units='ns').start())
+        # The clock is expected to come from the HDL side; toggling it from
+        # Python costs a simulator round trip per edge
+        if generate_clock:
+            cocotb.start_soon(Clock(self.clk, self.clk_period, units='ns').start())
 
         # Reset the interface
         cocotb.start_soon(self.reset())
@@ -116,47 +272,102 @@ class HyperBusMemory(Bus):
 
     async def read(self, address):
         # Simulate a read operation with initial latency
-        await Timer(self.initial_latency * 10, 'ns')  # Initial latency in clock cycles
-        data = self.memory.read(address, self.data_width // 8)
+        await self._latency()  # Initial latency
+        data = self.memory.read(address, self._data_bytes)
         return data
 
     async def write(self, address, data):
         # Simulate a write operation with initial latency
-        await Timer(self.initial_latency * 10, 'ns')  # Initial latency in clock cycles
-        self.memory.write(address, data, self.data_width // 8)
+        await self._latency()  # Initial latency
+        self.memory.write(address, data, self._data_bytes)
+
+    async def drive_phase(self, *, cs=None, rwds=None, dq=None, wait=0):
+        """
+        Drive CS#, RWDS and DQ in one step and then wait once.
+
+        Signals passed as None keep their current value. `wait` is in ns;
+        with the default of 0 the call returns without yielding.
+        """
+        if cs is not None:
+            self._csn.value = cs
+        if rwds is not None:
+            self._i_rwds.value = rwds
+        if dq is not None:
+            self._i_dq.value = dq
+        if wait:
+            await Timer(wait, 'ns')
+
+    def _latency(self):
+        """
+        Return the trigger for the initial latency of a read/write access.
+
+        The wait is time-based (initial_latency * clk_period ns) rather than
+        counted on `clk`: the HyperBus CK is stopped while CS# is high, which
+        is exactly when read() and write() are called by HyperBusController.
+        It is rebuilt on every access so changes to initial_latency apply.
+        """
+        return Timer(self.initial_latency * self.clk_period, 'ns')
 
     def decode_address(self, dq_value):
-        r_w = (dq_value >> 47) & 0x1  # Read/Write bit
-        as_ = (dq_value >> 46) & 0x1  # Address Space bit
-        burst_type = (dq_value >> 45) & 0x1  # Burst Type bit
-        row_column = (dq_value >> 16) & 0xFFFF  # Row & Upper Column bits
-        lower_column = dq_value & 0xFF  # Lower Column bits
-        address = (row_column << 8) | lower_column  # Combine row and column parts
-        return address, r_w, as_, burst_type
+        flags = dq_value >> 45  # CA[47:45] in a single shift
+        return (
+            # Row & Upper Column bits [31:16] land at [23:8], Lower Column bits stay at [7:0]
+            ((dq_value >> 8) & 0xFFFF00) | (dq_value & 0xFF),
+            (flags >> 2) & 0x1,  # Read/Write bit
+            (flags >> 1) & 0x1,  # Address Space bit
+            flags & 0x1,  # Burst Type bit
+        )
 
     def handle_burst(self, address, length, burst_type):
-        data = bytearray()
-        group_size = self.burst_length  # Assuming burst_length is the group size
+        """
+        Return `length` bytes of a `burst_type` burst starting at `address`.
 
-        if burst_type == 'wrapped':
-            # Implement wrapped burst logic
-            for i in range(length):
-                effective_address = (address + i) % group_size
-                data.append(self.memory.read(effective_address, 1))
-        elif burst_type == 'linear':
-            # Implement linear burst logic
-            data = self.memory.read(address, length)
-        elif burst_type == 'hybrid':
-            # Implement hybrid burst logic
-            wrapped_length = group_size - (address % group_size)
-            if wrapped_length > length:
-                wrapped_length = length
-            data = self.handle_burst(address, wrapped_length, 'wrapped')
-            if length > wrapped_length:
-                linear_length = length - wrapped_length
-                linear_address = address + wrapped_length
-                data += self.handle_burst(linear_address, linear_length, 'linear')
-        return data
+        Every burst type returns bytes; an unknown type returns b''. The reader
+        is looked up by name, so subclasses may override _read_wrapped,
+        _read_linear or _read_hybrid.
+        """
+        reader = self._BURST_READERS.get(burst_type)
+        if reader is None:
+            return b''
+        return getattr(self, reader)(address, length)
+
+    def _read_wrapped(self, address, length):
+        group_size = self.burst_length  # Assuming burst_length is the group size
+        start = address % group_size
+        if length <= group_size - start:
+            # The burst ends before the group boundary, so it never wraps
+            return self.memory.read(address, length)
+        # View the whole wrap group in one access and join it in contiguous
+        # runs, starting at address and wrapping back to the group boundary
+        group = self.memory.view(address - start, group_size)
+        parts = []
+        pos = 0
+        while pos < length:
+            chunk = min(length - pos, group_size - start)
+            parts.append(group[start:start+chunk])
+            pos += chunk
+            start = 0
+        return b''.join(parts)
+
+    def _read_linear(self, address, length):
+        return self.memory.read(address, length)
+
+    def _read_hybrid(self, address, length):
+        group_size = self.burst_length
+        wrapped_length = group_size - (address % group_size)
+        if wrapped_length >= length:
+            return self._read_wrapped(address, length)
+        # Join both segments in one copy rather than concatenating them
+        return b''.join((
+            self._read_wrapped(address, wrapped_length),
+            self.memory.view(address + wrapped_length, length - wrapped_length),
+        ))
+
+    _BURST_READERS = {
+        'wrapped': '_read_wrapped',
+        'linear': '_read_linear',
+        'hybrid': '_read_hybrid',
+    }
 
     async def handle_transactions(self):
         """
@@ -173,58 +384,87 @@ class HyperBusMemory(Bus):
           If write, the received data is stored in memory.
         - The function waits for CS# to go high before allowing a new transaction.
         """
+        # Bind handles, triggers and methods to locals once; the loop below
+        # runs for every transaction for the lifetime of the simulation
+        csn = self._csn
+        ck = self.bus.ck
+        rwds = self.bus.rwds
+        i_dq = self._i_dq
+        i_rwds = self._i_rwds
+        ck_rise = RisingEdge(ck)
+        ck_edge = Edge(ck)
+        csn_fall = FallingEdge(csn)
+        csn_rise = RisingEdge(csn)
+        capture_ca = self.capture_ca
+        decode_address = self.decode_address
+        handle_burst = self.handle_burst
+        write_with_masking = self.write_with_masking
+        drive_burst = self.dq_driver.drive_burst
+        release_dq = self.dq_driver.drive_high_impedance
+
         while True:
-            await FallingEdge(self.bus.o_csn0)  # Wait for CS# to go LOW (start of transaction)
+            await csn_fall  # Wait for CS# to go LOW (start of transaction)
             self.transaction_active = True  # Transaction is active
-            self.ca_bytes = []  # Reset CA buffer
-
-            for _ in range(3):  # 3 clock cycles → 6 CA bytes
-                await RisingEdge(self.bus.ck)  # Capture on rising edge
-                if self.bus.o_csn0.value == 1:  # If CS# goes high, abort transaction
-                    self.transaction_active = False
-                    self.ca_bytes = []
-                    break
-                self.capture_ca()
+            self._ca_idx = 0  # Reset CA buffer
 
-                await FallingEdge(self.bus.ck)  # Capture on falling edge
-                if self.bus.o_csn0.value == 1:  # If CS# goes high, abort transaction
+            # 3 clock cycles → 6 CA bytes, one per CK edge. CK idles low while
+            # CS# is high, so the first edge seen here is a rising one.
+            for _ in range(6):
+                await ck_edge
+                if csn.value == 1:  # If CS# goes high, abort transaction
                     self.transaction_active = False
-                    self.ca_bytes = []
+                    self._ca_idx = 0
                     break
-                self.capture_ca()
+                capture_ca()
 
-            if len(self.ca_bytes) == 6:  # Ensure full capture before decoding
-                ca_value = int.from_bytes(self.ca_bytes, byteorder="big")
-                address, rw, addr_space, burst_type = self.decode_address(ca_value)
-                self.ca_bytes = []  # Reset CA buffer
+            if self._ca_idx == 6:  # Ensure full capture before decoding
+                (ca_value,) = _CA_UNPACK(self._ca_buf)
+                address, rw, addr_space, burst_type = decode_address(ca_value)
+                self._ca_idx = 0  # Reset CA buffer
                 # Check RWDS during CA phase for additional latency
                 additional_latency = 0
-                if self.bus.rwds.value == 1:    # RWDS high indicates additional latency
+                if rwds.value == 1:    # RWDS high indicates additional latency
                     additional_latency = self.initial_latency  # Insert additional latency period
                     
                 if rw:  # Read transaction
-                    if burst_type == 0:  # Wrapped burst
-                    	data = self.handle_burst(address, self.burst_length, 'wrapped')
-                    elif burst_type == 1:  # Linear burst
-                    	data = self.handle_burst(address, self.burst_length, 'linear')
-                    await self.dq_driver.drive(data)  # Drive data to the bus
+                    # Burst type bit: 0 = wrapped, 1 = linear
+                    data = handle_burst(address, self.burst_length, 'linear' if burst_type else 'wrapped')
+                    # Drive data to the bus, one byte per clock, until CS# goes high;
+                    # CS# is watched once per transaction rather than on every beat
+                    burst = cocotb.start_soon(drive_burst(data, ck))
+                    await csn_rise
+                    burst.kill()
+                    release_dq()
                 else:  # Write transaction
-                    await RisingEdge(self.bus.ck)  # Ensure proper timing
-                    data_in = int(self.bus.i_dq.value)
-                    mask = int(self.bus.i_rwds.value)
-                    await self.write_with_masking(address, data_in, mask)
+                    await ck_rise  # Ensure proper timing
+                    data_in = i_dq.value.integer
+                    mask = i_rwds.value.integer
+                    await write_with_masking(address, data_in, mask)
 
-            await RisingEdge(self.bus.o_csn0)  # Wait for CS# to go HIGH (transaction end)
+            if csn.value != 1:  # A read burst has already seen CS# go high
+                await csn_rise  # Wait for CS# to go HIGH (transaction end)
             self.transaction_active = False  # Mark transaction as inactive
 
     def capture_ca(self):
-        ca_byte = int(self.bus.i_dq.value)
-        self.ca_bytes.append(ca_byte)
+        idx = self._ca_idx
+        self._ca_buf[idx + 2] = self._i_dq.value.integer & 0xFF
+        self._ca_idx = idx + 1
 
     async def write_with_masking(self, address, data, mask):
-        for i in range(len(data)):
-            if mask[i] == 0:  # Mask bit is 0, write the byte
-                self.memory.write(address + i, data[i], 1)
+        # `data` is a bytes-like object or a single DQ byte as an int; bit i of
+        # `mask` (RWDS) set means byte i is masked and left unchanged
+        if isinstance(data, int):
+            data = data.to_bytes(1, 'little')
+        length = len(data)
+        if not mask:
+            # Nothing masked: store the whole beat in one write
+            self.memory.write(address, data, length)
+            return
+        merged = bytearray(self.memory.view(address, length))
+        for i in range(length):
+            if not (mask >> i) & 1:  # Mask bit is 0, write the byte
+                merged[i] = data[i]
+        self.memory.write(address, merged, length)
 
     async def enter_deep_power_down(self):
         self.config_register.deep_power_down = 1
@@ -234,9 +474,13 @@ class HyperBusMemory(Bus):
         self.config_register.deep_power_down = 0
         # Implement power-up logic
 
-    def handle_error(self):
+    async def handle_error(self):
+        # A coroutine, so callers must await it. The hold is time-based like
+        # _latency(): CK may be stopped while CS# is high.
         self.rwds_driver.drive_high_impedance()
-        Timer(32, 'ns')  # Hold RWDS Low for 32 clock cycles
+        await Timer(32 * self.clk_period, 'ns')  # Hold RWDS for 32 clock periods
 
     def log(self, msg):
-        print(f'[{get_sim_time("ns")}]  {msg}')
+        # Only query the simulator for the timestamp when the message will be emitted
+        if self._logger.isEnabledFor(logging.DEBUG):
+            self._logger.debug('[%s]  %s', get_sim_time('ns'), msg)
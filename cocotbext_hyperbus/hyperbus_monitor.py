@@ -1,54 +1,73 @@
 # hyperbus_monitor.py
-from cocotb.triggers import RisingEdge, Timer
+from cocotb.triggers import RisingEdge, FallingEdge, Timer
 from cocotb.utils import get_sim_time
 
 class HyperBusMonitor:
+    """
+    Capture HyperBus transactions from the DUT's CS_, clk and DQ signals.
+
+    `ca_phase`, `data_phase` and the matching keys of each captured
+    transaction are bytes (formerly lists of ints), so every DQ sample must
+    fit in 8 bits; a wider value raises ValueError when it is stored.
+    """
     def __init__(self, dut):
         self.dut = dut
         self.transactions = []  # List to store captured transactions
-        self.ca_phase = []  # List to store CA phase data
-        self.data_phase = []  # List to store data phase data
+        self.ca_phase = b''  # CA phase bytes of the last transaction
+        self.data_phase = b''  # Data phase bytes of the last transaction
+        # Capture buffers reused across transactions; the data buffer doubles when full
+        self._ca_buf = bytearray(6)
+        self._data_buf = bytearray(4096)
+        self._data_len = 0
 
     async def monitor_transactions(self):
         """
         Monitor the HyperBus transactions.
         """
         while True:
-            await RisingEdge(self.dut.clk)
-            if self.dut.CS_.value == 0:  # Transaction active
-                self.ca_phase = []
-                self.data_phase = []
-                await self.capture_ca_phase()
-                await self.capture_data_phase()
-                transaction = {
-                    'time': get_sim_time('ns'),
-                    'ca_phase': self.ca_phase,
-                    'data_phase': self.data_phase
-                }
-                self.log_transaction(transaction)
-                self.transactions.append(transaction)
+            await FallingEdge(self.dut.CS_)  # Sleep until CS# goes LOW instead of polling every clock
+            await self.capture_ca_phase()
+            await self.capture_data_phase()
+            transaction = {
+                'time': get_sim_time('ns'),
+                'ca_phase': self.ca_phase,
+                'data_phase': self.data_phase
+            }
+            self.log_transaction(transaction)
+            self.transactions.append(transaction)
 
     async def capture_ca_phase(self):
         """
         Capture the CA phase of the transaction.
         """
-        for _ in range(6):  # Assuming CA is 6 bytes
-            await RisingEdge(self.dut.clk)
-            self.ca_phase.append(int(self.dut.DQ.value))
+        clk_rise = RisingEdge(self.dut.clk)
+        dq = self.dut.DQ
+        for i in range(6):  # Assuming CA is 6 bytes
+            await clk_rise
+            self._ca_buf[i] = dq.value.integer
+        self.ca_phase = bytes(self._ca_buf)
 
     async def capture_data_phase(self):
         """
         Capture the data phase of the transaction.
         """
-        while self.dut.CS_.value == 0:
-            await RisingEdge(self.dut.clk)
-            self.data_phase.append(int(self.dut.DQ.value))
+        clk_rise = RisingEdge(self.dut.clk)
+        cs = self.dut.CS_
+        dq = self.dut.DQ
+        self._data_len = 0
+        while cs.value == 0:
+            await clk_rise
+            if self._data_len == len(self._data_buf):
+                self._data_buf.extend(bytes(len(self._data_buf)))
+            self._data_buf[self._data_len] = dq.value.integer
+            self._data_len += 1
+        self.data_phase = bytes(memoryview(self._data_buf)[:self._data_len])  # Single copy
 
     def log_transaction(self, transaction):
         """
         Log the captured transaction.
         """
-        print(f"[{transaction['time']} ns] CA Phase: {transaction['ca_phase']}, Data Phase: {transaction['data_phase']}")
+        print(f"[{transaction['time']} ns] CA Phase: {list(transaction['ca_phase'])}, Data Phase: {list(transaction['data_phase'])}")
 
     def get_transactions(self):
         """
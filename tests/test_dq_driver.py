@@ -0,0 +1,69 @@
+# Pin order checks for DQDriver against plain handle stand-ins; no simulator is required
+import os
+import sys
+
+import pytest
+from cocotb.binary import BinaryValue
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'cocotbext_hyperbus'))
+
+from hyperbus_memory import DQDriver
+
+
+class _Handle:
+    value = None
+
+
+class _Dut:
+    def __init__(self):
+        for i in range(8):
+            setattr(self, f'dq{i}', _Handle())
+
+
+def _pins(dut):
+    # dq7..dq0, the same order as a binary string
+    return ''.join(str(getattr(dut, f'dq{i}').value) for i in reversed(range(8)))
+
+
+@pytest.mark.parametrize('value', [
+    0b00000101,
+    '00000101',
+    BinaryValue('00000101', 8),
+    BinaryValue('00000101', 8, bigEndian=False),
+])
+def test_resolvable_values_drive_bit_n_on_dqn(value):
+    dut = _Dut()
+    DQDriver(dut).drive(value)
+    assert _pins(dut) == '00000101'
+
+
+@pytest.mark.parametrize('value', [
+    '0000010z',
+    BinaryValue('0000010z', 8),
+    BinaryValue('0000010z', 8, bigEndian=False),
+    'x000010z',
+])
+def test_unresolvable_values_drive_bit_n_on_dqn(value):
+    dut = _Dut()
+    DQDriver(dut).drive(value)
+    expected = value if isinstance(value, str) else value.binstr
+    assert _pins(dut) == expected
+
+
+def test_packed_bus_gets_whole_value():
+    dut = _Dut()
+    bus = _Handle()
+    driver = DQDriver(dut, dq_bus=bus)
+    driver.drive(0x5A)
+    assert bus.value == 0x5A
+    driver.drive('0000010z')
+    assert bus.value.binstr == '0000010z'
+    driver.drive_high_impedance()
+    assert bus.value.binstr == 'ZZZZZZZZ'
+    assert all(getattr(dut, f'dq{i}').value is None for i in range(8))
+
+
+def test_pins_are_resolved_lazily():
+    driver = DQDriver(object())
+    with pytest.raises(AttributeError):
+        driver.drive(0)
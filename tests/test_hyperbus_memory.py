@@ -33,30 +33,26 @@ async def hyperbus_test(dut):
     await Timer(200, 'ns')
 
     # Perform write transaction
-    dut.o_csn0.value = 0  # Start transaction by pulling CS# low
-    await Timer(10, 'ns')
+    await memory.drive_phase(cs=0, wait=10)  # Start transaction by pulling CS# low
     dut.i_mem_valid.value = 1
     dut.i_mem_wstrb.value = 0xF  # Write all bytes
     dut.i_mem_addr.value = 0x1000  # Address 0x1000
     dut.i_mem_wdata.value = 0xDEADBEEF  # Data to write
     await Timer(20, 'ns')
     dut.i_mem_valid.value = 0
-    dut.o_csn0.value = 1  # End transaction by pulling CS# high
-    await Timer(10, 'ns')
+    await memory.drive_phase(cs=1, wait=10)  # End transaction by pulling CS# high
 
     # Wait for transaction to complete
     await Timer(100, 'ns')
 
     # Perform read transaction
-    dut.o_csn0.value = 0  # Start transaction by pulling CS# low
-    await Timer(10, 'ns')
+    await memory.drive_phase(cs=0, wait=10)  # Start transaction by pulling CS# low
     dut.i_mem_valid.value = 1
     dut.i_mem_wstrb.value = 0  # Read operation
     dut.i_mem_addr.value = 0x1000  # Address 0x1000
     await Timer(20, 'ns')
     dut.i_mem_valid.value = 0
-    dut.o_csn0.value = 1  # End transaction by pulling CS# high
-    await Timer(10, 'ns')
+    await memory.drive_phase(cs=1, wait=10)  # End transaction by pulling CS# high
 
     # Wait for transaction to complete
     await Timer(100, 'ns')
@@ -0,0 +1,127 @@
+# Pure-Python checks of the memory model; no simulator is required
+import array
+import asyncio
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'cocotbext_hyperbus'))
+
+from hyperbus_memory import HyperBusMemory, MemoryRegion
+
+
+def _model(burst_length=32, page_size=64):
+    # HyperBusMemory without a DUT: only the memory and burst state are needed
+    model = HyperBusMemory.__new__(HyperBusMemory)
+    model.memory = MemoryRegion(2**32, page_size=page_size)
+    model.burst_length = burst_length
+    return model
+
+
+def _wrapped(ref, address, length, group_size):
+    base = address - address % group_size
+    return bytes(ref[base + (address - base + i) % group_size] for i in range(length))
+
+
+def test_matches_flat_reference():
+    rng = random.Random(0)
+    memory = MemoryRegion(2**32, page_size=64)
+    ref = bytearray(4096)
+    for _ in range(5000):
+        address = rng.randrange(0, 4000)
+        length = rng.randrange(0, 90)
+        if rng.random() < 0.5:
+            data = bytes(rng.getrandbits(8) for _ in range(length))
+            memory.write(address, data, length)
+            ref[address:address+length] = data
+        else:
+            assert memory.read(address, length) == bytes(ref[address:address+length])
+            assert bytes(memory.view(address, length)) == bytes(ref[address:address+length])
+
+
+def test_untouched_reads_are_zero_and_do_not_allocate():
+    memory = MemoryRegion(2**32, page_size=64)
+    assert memory.read(2**31 - 10, 100) == bytes(100)
+    assert not memory._pages
+
+
+def test_last_page_cache_sees_later_allocation():
+    memory = MemoryRegion(2**32, page_size=64)
+    memory.write(0, b'\x01', 1)
+    assert memory.read(200, 1) == b'\x00'  # untouched page, not cached
+    memory.write(200, b'\x02', 1)
+    assert memory.read(0, 1) == b'\x01'
+    assert memory.read(200, 1) == b'\x02'
+
+
+def test_integer_and_buffer_writes():
+    memory = MemoryRegion(2**32, page_size=64)
+    memory.write(62, 0xDEADBEEF, 4)
+    assert memory.read(62, 4) == bytes.fromhex('efbeadde')
+    memory.write(100, array.array('H', [0x1234, 0x5678]))
+    assert memory.read(100, 4) == bytes.fromhex('34127856')
+    memory.write(200, b'abcdef', 3)
+    assert memory.read(200, 6) == b'abc\x00\x00\x00'
+    with pytest.raises(ValueError):
+        memory.write(0, 5)
+
+
+def test_non_buffer_writes():
+    memory = MemoryRegion(2**32, page_size=64)
+    memory.write(62, [1, 2, 3], 3)
+    assert memory.read(62, 3) == b'\x01\x02\x03'
+    memory.write(120, (i for i in range(4, 9)), 3)
+    assert memory.read(120, 5) == b'\x04\x05\x06\x00\x00'
+    # A strided (non-contiguous) view cannot be cast and is copied instead
+    memory.write(200, memoryview(b'abcdefgh')[::2])
+    assert memory.read(200, 4) == b'aceg'
+
+
+@pytest.mark.parametrize('page_size', [0, 3, 100, -64])
+def test_page_size_must_be_power_of_two(page_size):
+    with pytest.raises(ValueError):
+        MemoryRegion(1024, page_size=page_size)
+
+
+def test_burst_readers_match_reference():
+    rng = random.Random(1)
+    model = _model()
+    ref = bytes(rng.getrandbits(8) for _ in range(8192))
+    model.memory.write(0, ref)
+    for _ in range(2000):
+        address = rng.randrange(0, 8000)
+        length = rng.randrange(0, 80)
+        wrapped = model.handle_burst(address, length, 'wrapped')
+        linear = model.handle_burst(address, length, 'linear')
+        hybrid = model.handle_burst(address, length, 'hybrid')
+        assert wrapped == _wrapped(ref, address, length, 32)
+        assert linear == ref[address:address+length]
+        head = min(32 - address % 32, length)
+        assert hybrid == _wrapped(ref, address, head, 32) + ref[address+head:address+length]
+        assert type(wrapped) is type(linear) is type(hybrid) is bytes
+    assert model.handle_burst(0, 4, 'unknown') == b''
+
+
+def test_burst_reader_override_is_used():
+    class Model(HyperBusMemory):
+        def _read_linear(self, address, length):
+            return b'\xaa' * length
+
+    model = Model.__new__(Model)
+    model.memory = MemoryRegion(2**32)
+    model.burst_length = 32
+    assert model.handle_burst(0, 3, 'linear') == b'\xaa\xaa\xaa'
+
+
+def test_write_with_masking():
+    model = _model()
+    model.memory.write(0, b'\x11\x22\x33\x44')
+    # Mask bit set (RWDS high) keeps the existing byte
+    asyncio.run(model.write_with_masking(0, b'\xaa\xbb\xcc\xdd', 0b0101))
+    assert model.memory.read(0, 4) == b'\x11\xbb\x33\xdd'
+    asyncio.run(model.write_with_masking(8, 0x5A, 0))
+    assert model.memory.read(8, 1) == b'\x5a'
+    asyncio.run(model.write_with_masking(8, 0x11, 1))
+    assert model.memory.read(8, 1) == b'\x5a'